@@ -3,18 +3,16 @@
 ### Released under the MIT License https://opensource.org/licenses/MIT
 ###
 
-import glob
 import logging
-import os
 import signal
 import sys
 import time
 from pathlib import Path
 
-from secure_database import KismetDB
 from ignore_list_loader import load_ignore_lists
+from events import BufferedEventWriter
 from secure_main_logic import SecureCYTMonitor
-from utils import load_config
+from utils import load_config, find_latest_file
 
 config = load_config('config.json')
 
@@ -36,8 +34,10 @@ logger = logging.getLogger(__name__)
 
 event_log_file = logs_dir / 'probes' / f'events.jsonl'
 
-cyt_log = open(log_file, "w", buffering=1)
-event_log = open(event_log_file, buffering=1)
+event_log_file.parent.mkdir(parents=True, exist_ok=True)
+
+cyt_log = open(log_file, "w")
+event_log = BufferedEventWriter(event_log_file)
 
 #######Load ignore lists securely - NO MORE exec()!
 
@@ -48,24 +48,23 @@ logging.info(f"Loaded {len(ignore_list)} MAC addresses and {len(probe_ignore_lis
 db_path = config['paths']['kismet_logs']
 
 try:
-    list_of_files = glob.glob(db_path)
-    if not list_of_files:
+    latest_file = find_latest_file(db_path)
+    if not latest_file:
         raise FileNotFoundError(f"No Kismet database files found at: {db_path}")
 
-    latest_file = max(list_of_files, key=os.path.getctime)
     logging.info(f"Using Kismet database: {latest_file}")
 
     # Initialize secure monitor
-    secure_monitor = SecureCYTMonitor(config, ignore_list, probe_ignore_list, cyt_log, event_log)
+    secure_monitor = SecureCYTMonitor(config, latest_file, ignore_list, probe_ignore_list, cyt_log, event_log)
 
-    # Test database connection and initialize tracking lists
-    with KismetDB(latest_file) as db:
-        if not db.validate_connection():
-            raise RuntimeError("Database validation failed")
+    # Open the long-lived database connection, test it and initialize tracking lists
+    secure_monitor.db.connect()
+    if not secure_monitor.db.validate_connection():
+        raise RuntimeError("Database validation failed")
 
-        logger.info("Initializing secure tracking lists...")
-        secure_monitor.initialize_tracking_lists(db)
-        print("Initialization complete!")
+    logger.info("Initializing secure tracking lists...")
+    secure_monitor.initialize_tracking_lists()
+    print("Initialization complete!")
 
 except Exception as e:
     logging.error("Fatal error during initialization", exc_info=e)
@@ -79,6 +78,8 @@ def signal_handler(signum, frame):
     print("\nShutting down gracefully...")
     cyt_log.write("Shutting down gracefully...\n")
     logging.info("CYT monitoring stopped by user")
+    secure_monitor.db.close()
+    event_log.close()
     cyt_log.close()
     sys.exit(0)
 
@@ -98,14 +99,23 @@ while True:
     time_count += 1
 
     try:
-        # Process current activity with secure database operations
-        with KismetDB(latest_file) as db:
-            secure_monitor.process_current_activity(db)
-
-            # Rotate tracking lists every N cycles (default 5 = 5 minutes)
-            if time_count % list_update_interval == 0:
-                logging.info(f"Rotating tracking lists (cycle {time_count})")
-                secure_monitor.rotate_tracking_lists(db)
+        # Compute this cycle's time boundaries once and share them between processing and rotation
+        boundaries = secure_monitor.time_manager.get_time_boundaries()
+
+        # Process current activity over the monitor's persistent database connection
+        secure_monitor.process_current_activity(boundaries)
+
+        # Rotate tracking lists every N cycles (default 5 = 5 minutes)
+        if time_count % list_update_interval == 0:
+            logging.info(f"Rotating tracking lists (cycle {time_count})")
+            secure_monitor.rotate_tracking_lists(boundaries)
+
+            # Kismet starts a new database file when it restarts, follow it
+            newest_file = find_latest_file(db_path)
+            if newest_file and newest_file != latest_file:
+                logging.info(f"Switching to newer Kismet database: {newest_file}")
+                secure_monitor.switch_database(newest_file)
+                latest_file = newest_file
 
     except Exception as e:
         error_msg = f"Error in monitoring loop: {e}"
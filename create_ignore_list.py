@@ -13,21 +13,17 @@ def sql_fetch(con: Connection):
 
     cursor.execute("SELECT devmac FROM devices")
 
-    rows = cursor.fetchall()
-
-    for row in rows:
-        # why tf does it need to replace all these characters???
-        stripped_val = str(row).replace("(", "").replace(")", "").replace("'", "").replace(",", "")
-        non_alert_list.append(stripped_val)
+    # dedupe and normalize to uppercase at the source
+    non_alert_list.extend(sorted({row[0].upper() for row in cursor if row[0]}))
 
 
 def grab_all_probes(con: Connection):
     cursor = con.cursor()
-    cursor.execute("SELECT devmac, type, device FROM devices")
-    rows = cursor.fetchall()
-    for row in rows:
-        raw_device_json = json.loads(row[2])
-        if 'dot11.probedssid.ssid' in str(row):
+    cursor.execute("SELECT CAST(device AS TEXT) FROM devices")
+    for (device,) in cursor:
+        # cheap substring check on the raw JSON, only parse devices that actually probed
+        if device and 'dot11.probedssid.ssid' in device:
+            raw_device_json = json.loads(device)
             ssid_probed_for = raw_device_json["dot11.device"]["dot11.device.last_probed_ssid_record"]["dot11.probedssid.ssid"]  ### Grabbed SSID Probed for
             if ssid_probed_for == '':
                 pass
@@ -55,11 +51,13 @@ print('Added {} MACs to the ignore list.'.format(len(non_alert_list)))
 ignore_list_path = Path(config['paths']['ignore_lists']['mac'])
 ignore_list_path.parent.mkdir(parents=True, exist_ok=True)
 with open(ignore_list_path, "w") as ignore_list:
-    ignore_list.write("ignore_list = " + str(non_alert_list))
+    json.dump(non_alert_list, ignore_list)
 
 grab_all_probes(con)
 
 print('Added {} Probed SSIDs to the ignore list.'.format(len(non_alert_ssid_list)))
 
-with open(Path(config['paths']['ignore_lists']['ssid']), "w") as ignore_list_ssid:
-    ignore_list_ssid.write("non_alert_ssid_list = " + str(non_alert_ssid_list))
+ssid_ignore_list_path = Path(config['paths']['ignore_lists']['ssid'])
+ssid_ignore_list_path.parent.mkdir(parents=True, exist_ok=True)
+with open(ssid_ignore_list_path, "w") as ignore_list_ssid:
+    json.dump(non_alert_ssid_list, ignore_list_ssid)
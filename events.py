@@ -1,7 +1,10 @@
 import json
+import os
+import time
 from datetime import datetime
 from json import JSONEncoder, JSONDecoder
-from typing import Dict, Any, IO
+from pathlib import Path
+from typing import Dict, Any, IO, Union
 
 
 class Event:
@@ -44,6 +47,11 @@ class EventEncoder(JSONEncoder):
         return data
 
 
+def format_timestamp(ts: datetime) -> str:
+    # equivalent to ts.strftime('%m/%d/%Y %H:%M:%S'), but without strftime's per-call overhead
+    return f'{ts.month:02}/{ts.day:02}/{ts.year} {ts.hour:02}:{ts.minute:02}:{ts.second:02}'
+
+
 def encode_event(event: Any) -> Dict[str, Any]:
     if not isinstance(event, Event):
         raise TypeError(f'Can only serialize subclasses of Event, not {event.__class__.__name__}.')
@@ -57,7 +65,7 @@ def encode_event(event: Any) -> Dict[str, Any]:
     else:
         raise TypeError(f'Can only serialize known subclasses of Event, not {event.__class__.__name__}.')
 
-    data['timestamp'] = event.timestamp.strftime('%m/%d/%Y %H:%M:%S')
+    data['timestamp'] = format_timestamp(event.timestamp)
 
     return data
 
@@ -75,11 +83,66 @@ def decode_event(data: Dict[str, Any]):
         raise TypeError(f'Unknown event type "{event_type}" for data {data}')
 
 
+def dump_event(event: Event) -> str:
+    if type(event) is SSIDProbeEvent:
+        # every probe event has the same shape, so skip the JSONEncoder recursion and fill in a template
+        return (f'{{"type":"ssid-probe","ssid":{json.dumps(event.ssid)},"mac":{json.dumps(event.mac)},'
+                f'"timestamp":"{format_timestamp(event.timestamp)}"}}')
+
+    return json.dumps(event, default=encode_event, separators=(',', ':'))
+
+
 def write_event_log(file: IO, event: Event):
-    # the type for fp is correct, intellij is just confused
-    # noinspection PyTypeChecker
-    json.dump(event, fp=file, default=encode_event, indent=0)
-    file.write('\n')
+    file.write(dump_event(event) + '\n')
+
+
+class BufferedEventWriter:
+    """
+    Appends events to a JSON lines file, coalescing them into batched writes.
+    The buffer is written out once it holds max_bytes or max_events, or on the first write after max_delay seconds.
+    """
+
+    def __init__(self, path: Union[str, Path], max_bytes: int = 65536, max_events: int = 500, max_delay: float = 0.05):
+        self.max_bytes = max_bytes
+        self.max_events = max_events
+        self.max_delay = max_delay
+        self.__fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.__buffer = bytearray()
+        self.__buffered_events = 0
+        self.__last_flush = time.monotonic()
+
+    def write(self, event: Event) -> None:
+        self.__buffer += dump_event(event).encode()
+        self.__buffer += b'\n'
+        self.__buffered_events += 1
+
+        if (len(self.__buffer) >= self.max_bytes or self.__buffered_events >= self.max_events
+                or time.monotonic() - self.__last_flush > self.max_delay):
+            self.flush()
+
+    def flush(self) -> None:
+        # Trim each chunk as soon as it reaches the file, so a write that fails partway through
+        # leaves only the unwritten tail buffered and the next flush never writes a line twice
+        while self.__buffer:
+            del self.__buffer[:os.write(self.__fd, self.__buffer)]
+
+        self.__buffered_events = 0
+        self.__last_flush = time.monotonic()
+
+    def close(self) -> None:
+        if self.__fd < 0:
+            return
+
+        self.flush()
+        os.fsync(self.__fd)
+        os.close(self.__fd)
+        self.__fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
 
 def read_event_line(line: str) -> Event:
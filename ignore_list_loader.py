@@ -5,7 +5,7 @@ import json
 import logging
 import re
 from pathlib import Path
-from typing import List
+from typing import List, FrozenSet, Tuple
 
 from input_validation import InputValidator
 
@@ -36,21 +36,7 @@ class IgnoreListLoader:
             return []
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-
-            # Try JSON format first
-            if content.startswith('[') and content.endswith(']'):
-                try:
-                    mac_list = json.loads(content)
-                    if not isinstance(mac_list, list):
-                        raise ValueError("JSON content is not a list")
-                except json.JSONDecodeError:
-                    # Fall back to Python list parsing
-                    mac_list = cls.__parse_python_list(content, 'ignore_list')
-            else:
-                # Parse Python variable assignment
-                mac_list = cls.__parse_python_list(content, 'ignore_list')
+            mac_list = cls.__read_list(file_path, 'ignore_list')
 
             # Validate all MAC addresses
             validated_macs = []
@@ -78,21 +64,7 @@ class IgnoreListLoader:
             return []
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-
-            # Try JSON format first
-            if content.startswith('[') and content.endswith(']'):
-                try:
-                    ssid_list = json.loads(content)
-                    if not isinstance(ssid_list, list):
-                        raise ValueError("JSON content is not a list")
-                except json.JSONDecodeError:
-                    # Fall back to Python list parsing
-                    ssid_list = cls.__parse_python_list(content, 'non_alert_ssid_list')
-            else:
-                # Parse Python variable assignment
-                ssid_list = cls.__parse_python_list(content, 'non_alert_ssid_list')
+            ssid_list = cls.__read_list(file_path, 'non_alert_ssid_list')
 
             # Validate all SSIDs
             validated_ssids = []
@@ -109,6 +81,24 @@ class IgnoreListLoader:
             logger.error(f"Error loading SSID list from {file_path}: {e}")
             return []
 
+    @classmethod
+    def __read_list(cls, file_path: Path, variable_name: str) -> List[str]:
+        """
+        Read a list from an ignore list file
+        JSON is parsed straight from the file, legacy Python assignments fall back to text parsing
+        """
+        with open(file_path, 'r', encoding='utf-8') as f:
+            try:
+                items = json.load(f)
+            except json.JSONDecodeError:
+                f.seek(0)
+                # Parse legacy Python variable assignment
+                return cls.__parse_python_list(f.read().strip(), variable_name)
+
+        if not isinstance(items, list):
+            raise ValueError("JSON content is not a list")
+        return items
+
     @staticmethod
     def __parse_python_list(content: str, variable_name: str) -> List[str]:
         """
@@ -159,10 +149,10 @@ class IgnoreListLoader:
         logger.info(f"Saved {len(valid_ssids)} SSIDs to {file_path}")
 
 
-def load_ignore_lists(config: dict) -> tuple[List[str], List[str]]:
+def load_ignore_lists(config: dict) -> Tuple[FrozenSet[str], FrozenSet[str]]:
     """
     Convenience function to load both MAC and SSID ignore lists
-    Returns: (mac_list, ssid_list)
+    Returns: (mac_set, ssid_set), MACs normalized to uppercase
     """
     loader = IgnoreListLoader()
 
@@ -174,4 +164,4 @@ def load_ignore_lists(config: dict) -> tuple[List[str], List[str]]:
     ssid_path = Path(config['paths']['ignore_lists']['ssid'])
     ssid_list = loader.load_ssid_list(ssid_path)
 
-    return mac_list, ssid_list
+    return frozenset(mac_list), frozenset(ssid_list)
@@ -2,6 +2,7 @@
 Input validation and sanitization for CYT
 Prevents injection attacks and ensures data integrity
 """
+import itertools
 import logging
 import re
 
@@ -12,18 +13,24 @@ class InputValidator:
     """Comprehensive input validation for CYT"""
 
     MAC_PATTERN = re.compile(r'^([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})$')
+    # Direct equivalent of MAC_PATTERN: map every hex digit to '0' and compare against all valid shapes
+    MAC_HEX_TABLE = str.maketrans('0123456789abcdefABCDEF', '0' * 22)
+    MAC_SHAPES = frozenset('00' + '00'.join(seps) + '00' for seps in itertools.product(':-', repeat=5))
 
     # Dangerous characters to filter
-    DANGEROUS_CHARS = ['<', '>', '"', "'", '&', ';', '|', '`', '$', '(', ')', '{', '}', '[', ']']
+    DANGEROUS_CHARS = frozenset(['<', '>', '"', "'", '&', ';', '|', '`', '$', '(', ')', '{', '}', '[', ']'])
+
+    # Single pass over the SSID: control characters (except tab, newline, carriage return) or dangerous characters
+    SSID_BAD_CHAR_PATTERN = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f' + re.escape(''.join(sorted(DANGEROUS_CHARS))) + ']')
 
     @classmethod
     def validate_mac_address(cls, mac: str) -> bool:
         """Validate MAC address format"""
         if not isinstance(mac, str):
             return False
-        if len(mac) > 17:  # Max length for MAC address
+        if len(mac) != 17:  # Fixed length for XX:XX:XX:XX:XX:XX
             return False
-        return bool(cls.MAC_PATTERN.match(mac))
+        return mac.translate(cls.MAC_HEX_TABLE) in cls.MAC_SHAPES
 
     @classmethod
     def validate_ssid(cls, ssid: str) -> bool:
@@ -32,11 +39,10 @@ class InputValidator:
             return False
         if len(ssid) == 0 or len(ssid) > 32:
             return False
-        # Check for null bytes and control characters
-        if '\x00' in ssid or any(ord(c) < 32 and c not in '\t\n\r' for c in ssid):
-            return False
-        # Check for dangerous characters
-        if any(char in ssid for char in cls.DANGEROUS_CHARS):
-            logger.warning(f"SSID contains dangerous characters: {ssid}")
+        # Check for null bytes, control characters and dangerous characters
+        match = cls.SSID_BAD_CHAR_PATTERN.search(ssid)
+        if match:
+            if match.group() in cls.DANGEROUS_CHARS:
+                logger.warning(f"SSID contains dangerous characters: {ssid}")
             return False
         return True
@@ -1,22 +1,57 @@
 """
 Secure database operations - prevents SQL injection
 """
-import json
 import logging
 import sqlite3
 import time
-from datetime import datetime, timedelta
-from typing import List, Tuple, Optional, Dict, Any
+from typing import List, Tuple, Optional, Dict, Any, Iterable, Iterator
+
+try:
+    # Optional: orjson decodes device blobs several times faster than the stdlib parser
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 logger = logging.getLogger(__name__)
 
+# SSID of the last probe request, extracted inside SQLite (NULL for malformed device JSON)
+PROBED_SSID_SQL = ("CASE WHEN json_valid(CAST(d.device AS TEXT)) THEN json_extract(CAST(d.device AS TEXT), "
+                   "'$.\"dot11.device\".\"dot11.device.last_probed_ssid_record\".\"dot11.probedssid.ssid\"') END")
+
+# Query texts are fixed so sqlite3's per-connection statement cache reuses the prepared statements
+# MACs are normalized to uppercase here rather than per device in Python
+_Q_DEVICES_RANGE = ("SELECT upper(d.devmac) AS devmac, d.type, d.device, d.last_time FROM devices d "
+                    "LEFT JOIN ignored_macs i ON upper(d.devmac) = i.mac "
+                    "WHERE d.last_time >= ? AND i.mac IS NULL")
+_Q_DEVICES_RANGE_BOUNDED = _Q_DEVICES_RANGE + " AND d.last_time <= ?"
+
+# Just the MACs, so window queries never transfer or decode device blobs
+_Q_MACS_RANGE = ("SELECT upper(d.devmac) AS devmac FROM devices d "
+                 "LEFT JOIN ignored_macs i ON upper(d.devmac) = i.mac "
+                 "WHERE d.last_time >= ? AND i.mac IS NULL")
+_Q_MACS_RANGE_BOUNDED = _Q_MACS_RANGE + " AND d.last_time <= ?"
+
+_PROBES_SQL = ("SELECT p.devmac, p.last_time, p.ssid FROM ("
+               f"SELECT upper(d.devmac) AS devmac, d.last_time, {PROBED_SSID_SQL} AS ssid FROM devices d "
+               "LEFT JOIN ignored_macs i ON upper(d.devmac) = i.mac "
+               "WHERE d.last_time >= ? AND i.mac IS NULL{bound}) p "
+               "LEFT JOIN ignored_ssids s ON s.ssid = p.ssid "
+               "WHERE typeof(p.ssid) = 'text' AND p.ssid != '' AND s.ssid IS NULL")
+_Q_PROBES_RANGE = _PROBES_SQL.replace("{bound}", "")
+_Q_PROBES_RANGE_BOUNDED = _PROBES_SQL.replace("{bound}", " AND d.last_time <= ?")
+
 
 class KismetDB:
     """Secure wrapper for Kismet database operations"""
 
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, ignore_macs: Iterable[str] = (), ignore_ssids: Iterable[str] = ()):
         self.db_path = db_path
+        self.ignore_macs = ignore_macs
+        self.ignore_ssids = ignore_ssids
         self.__connection = None
+        self.__ssid_table_ready = False
+        self.__time_index_ready = False
+        self.__time_index_warned = False
 
     def __enter__(self):
         self.connect()
@@ -30,6 +65,21 @@ class KismetDB:
         try:
             self.__connection = sqlite3.connect(self.db_path, timeout=30.0)
             self.__connection.row_factory = sqlite3.Row  # Enable column access by name
+
+            # The connection is long-lived, so keep temp tables in memory and map the file rather than
+            # copying pages through read() calls. The only write to Kismet's file is the last_time index
+            # (see ensure_time_index); journal_mode/synchronous are left alone since Kismet owns the file.
+            self.__connection.execute("PRAGMA temp_store=MEMORY")
+            self.__connection.execute("PRAGMA mmap_size=268435456")
+
+            self.ensure_time_index()
+
+            # Materialize the MAC ignore list so filtering happens inside SQLite
+            self.__connection.execute("CREATE TEMP TABLE ignored_macs(mac TEXT PRIMARY KEY) WITHOUT ROWID")
+            self.__connection.executemany("INSERT OR IGNORE INTO ignored_macs VALUES (?)",
+                                          [(mac.upper(),) for mac in self.ignore_macs])
+            # Commit so no transaction (and therefore no stale read snapshot) stays open
+            self.__connection.commit()
             logger.info(f"Connected to database: {self.db_path}")
         except sqlite3.Error as e:
             logger.error(f"Failed to connect to database {self.db_path}: {e}")
@@ -40,6 +90,46 @@ class KismetDB:
         if self.__connection:
             self.__connection.close()
             self.__connection = None
+            self.__ssid_table_ready = False
+            self.__time_index_ready = False
+
+    def ensure_time_index(self) -> None:
+        """
+        Index last_time in Kismet's database so time window queries are range scans instead of full table scans
+        Safe to call repeatedly: failures (Kismet holding the write lock, a freshly rotated database without
+        a devices table yet, a read-only file) are retried on the next call
+        """
+        if self.__time_index_ready or not self.__connection:
+            return
+
+        # Don't stall for the full busy timeout if Kismet is holding the write lock
+        busy_timeout = self.__connection.execute("PRAGMA busy_timeout").fetchone()[0]
+        self.__connection.execute("PRAGMA busy_timeout=250")
+        try:
+            self.__connection.execute("CREATE INDEX IF NOT EXISTS idx_devices_last_time ON devices(last_time)")
+            self.__connection.commit()
+            self.__time_index_ready = True
+        except sqlite3.Error as e:
+            # Queries still work, just without the index
+            self.__connection.rollback()
+            if not self.__time_index_warned:
+                logger.warning(f"Could not create last_time index on {self.db_path}, will retry: {e}")
+                self.__time_index_warned = True
+            else:
+                logger.debug(f"Could not create last_time index on {self.db_path}: {e}")
+        finally:
+            self.__connection.execute(f"PRAGMA busy_timeout={int(busy_timeout)}")
+
+    def __ensure_ssid_table(self) -> None:
+        """Materialize the SSID ignore list, only once probe queries are actually run"""
+        if self.__ssid_table_ready:
+            return
+
+        self.__connection.execute("CREATE TEMP TABLE ignored_ssids(ssid TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.__connection.executemany("INSERT OR IGNORE INTO ignored_ssids VALUES (?)",
+                                      [(ssid,) for ssid in self.ignore_ssids])
+        self.__connection.commit()
+        self.__ssid_table_ready = True
 
     def execute_safe_query(self, query: str, params: Tuple = ()) -> List[sqlite3.Row]:
         """Execute parameterized query safely"""
@@ -54,93 +144,95 @@ class KismetDB:
             logger.error(f"Database query failed: {query}, params: {params}, error: {e}")
             raise
 
-    def get_devices_by_time_range(self, start_time: float, end_time: Optional[float] = None) -> List[Dict[str, Any]]:
+    def execute_safe_query_iter(self, query: str, params: Tuple = ()) -> Iterator[sqlite3.Row]:
         """
-        Get devices within time range with proper parameterization
+        Execute parameterized query safely, streaming rows from the cursor instead of fetching them all
+        The cursor holds a read lock on the database (blocking Kismet's writes) until it is exhausted,
+        so only use this when the per-row work of the consumer is trivial
+        """
+        if not self.__connection:
+            raise RuntimeError("Database not connected")
+
+        try:
+            cursor = self.__connection.cursor()
+            cursor.execute(query, params)
+            return cursor
+        except sqlite3.Error as e:
+            logger.error(f"Database query failed: {query}, params: {params}, error: {e}")
+            raise
+
+    def get_devices_by_time_range(self, start_time: float, end_time: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Get non-ignored devices within time range with proper parameterization
         
         Args:
             start_time: Unix timestamp for start time
             end_time: Optional unix timestamp for end time
             
         Returns:
-            List of device dictionaries
+            Iterator of device dictionaries, parsed lazily
         """
+        # Rows are fetched up front so the read lock is released before any JSON decoding or caller-side work
         if end_time is not None:
-            query = "SELECT devmac, type, device, last_time FROM devices WHERE last_time >= ? AND last_time <= ?"
-            params = (start_time, end_time)
+            rows = self.execute_safe_query(_Q_DEVICES_RANGE_BOUNDED, (start_time, end_time))
         else:
-            query = "SELECT devmac, type, device, last_time FROM devices WHERE last_time >= ?"
-            params = (start_time,)
+            rows = self.execute_safe_query(_Q_DEVICES_RANGE, (start_time,))
 
-        rows = self.execute_safe_query(query, params)
+        return self.__parse_device_rows(rows)
 
-        devices = []
+    @staticmethod
+    def __parse_device_rows(rows: Iterable[sqlite3.Row]) -> Iterator[Dict[str, Any]]:
+        """Convert raw device rows into device dictionaries"""
         for row in rows:
             try:
                 # Parse device JSON safely
                 device_data = None
                 if row['device']:
                     try:
-                        device_data = json.loads(row['device'])
-                    except (json.JSONDecodeError, TypeError) as e:
+                        device_data = json_loads(row['device'])
+                    except (ValueError, TypeError) as e:
                         logger.warning(f"Failed to parse device JSON for {row['devmac']}: {e}")
 
-                devices.append({
+                device = {
                     'mac': row['devmac'],
                     'type': row['type'],
                     'device_data': device_data,
                     'last_time': row['last_time']
-                })
+                }
             except Exception as e:
                 logger.warning(f"Error processing device row: {e}")
                 continue
 
-        return devices
+            yield device
+
+    def get_mac_addresses_by_time_range(self, start_time: float, end_time: Optional[float] = None) -> Iterator[str]:
+        """Get just MAC addresses for a time range, lazily"""
+        if end_time is not None:
+            rows = self.execute_safe_query_iter(_Q_MACS_RANGE_BOUNDED, (start_time, end_time))
+        else:
+            rows = self.execute_safe_query_iter(_Q_MACS_RANGE, (start_time,))
 
-    def get_mac_addresses_by_time_range(self, start_time: float, end_time: Optional[float] = None) -> List[str]:
-        """Get just MAC addresses for a time range"""
-        devices = self.get_devices_by_time_range(start_time, end_time)
-        return [device['mac'] for device in devices if device['mac']]
+        return (row['devmac'] for row in rows if row['devmac'])
 
-    def get_probe_requests_by_time_range(self, start_time: float, end_time: Optional[float] = None) -> List[Dict[str, str]]:
+    def get_probe_requests_by_time_range(self, start_time: float, end_time: Optional[float] = None) -> Iterator[Dict[str, str]]:
         """
-        Get probe requests with SSIDs for time range
+        Get probe requests with non-ignored SSIDs for time range
         
         Returns:
-            List of dicts with 'mac', 'ssid', 'timestamp'
+            Iterator of dicts with 'mac', 'ssid', 'timestamp'
         """
-        devices = self.get_devices_by_time_range(start_time, end_time)
+        if not self.__connection:
+            raise RuntimeError("Database not connected")
 
-        probes = []
-        for device in devices:
-            mac = device['mac']
-            device_data = device['device_data']
+        self.__ensure_ssid_table()
 
-            if not device_data:
-                continue
-
-            # Extract probe request SSID safely
-            try:
-                dot11_device = device_data.get('dot11.device', {})
-                if not isinstance(dot11_device, dict):
-                    continue
-
-                probe_record = dot11_device.get('dot11.device.last_probed_ssid_record', {})
-                if not isinstance(probe_record, dict):
-                    continue
-
-                ssid = probe_record.get('dot11.probedssid.ssid', '')
-                if ssid and isinstance(ssid, str):
-                    probes.append({
-                        'mac': mac,
-                        'ssid': ssid,
-                        'timestamp': device['last_time']
-                    })
-            except (KeyError, TypeError, AttributeError) as e:
-                logger.debug(f"No probe data for device {mac}: {e}")
-                continue
+        # Only the SSID string crosses the sqlite/Python boundary, never the device blob
+        if end_time is not None:
+            rows = self.execute_safe_query_iter(_Q_PROBES_RANGE_BOUNDED, (start_time, end_time))
+        else:
+            rows = self.execute_safe_query_iter(_Q_PROBES_RANGE, (start_time,))
 
-        return probes
+        return ({'mac': row['devmac'], 'ssid': row['ssid'], 'timestamp': row['last_time']} for row in rows)
 
     def validate_connection(self) -> bool:
         """Validate database connection and basic structure"""
@@ -166,20 +258,20 @@ class SecureTimeWindows:
             'old': 15,
             'oldest': 20
         })
-
-    def get_time_boundaries(self) -> Dict[str, float]:
-        """Calculate secure time boundaries"""
-        now = datetime.now()
-
-        boundaries = {}
-        for window_name, minutes in self.time_windows.items():
-            boundary_time = now - timedelta(minutes=minutes)
-            boundaries[f'{window_name}_time'] = time.mktime(boundary_time.timetuple())
-
+        self._window_seconds = [(f'{window_name}_time', minutes * 60) for window_name, minutes in self.time_windows.items()]
         # Add current time boundary (2 minutes ago for active scanning)
-        current_boundary = now - timedelta(minutes=2)
-        boundaries['current_time'] = time.mktime(current_boundary.timetuple())
+        self._window_seconds.append(('current_time', 2 * 60))
+        self._boundaries = {name: 0.0 for name, _ in self._window_seconds}
 
+    def get_time_boundaries(self) -> Dict[str, float]:
+        """
+        Calculate secure time boundaries as unix timestamps
+        The same dict is updated in place on every call, so treat it as read-only and copy it to keep it
+        """
+        now = time.time()
+        boundaries = self._boundaries
+        for name, seconds in self._window_seconds:
+            boundaries[name] = now - seconds
         return boundaries
 
 
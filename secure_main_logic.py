@@ -2,46 +2,56 @@
 Secure main logic for Chasing Your Tail - replaces vulnerable SQL operations
 """
 import logging
+from collections import deque
 from datetime import datetime
 from typing import IO
-from typing import List, Dict, Set, Any
+from typing import Dict, Set, Any, Deque, Iterable, Tuple
 
-from chasing_your_tail import event_log_file
-from events import write_event_log, SSIDProbeEvent
+from events import BufferedEventWriter, SSIDProbeEvent
 from secure_database import KismetDB, SecureTimeWindows
 
 logger = logging.getLogger(__name__)
 
+# Labels of the tracking windows, indexed like the window deques (0 = most recent)
+WINDOW_LABELS = ("Past 5 minutes", "5-10 minutes ago", "10-15 minutes ago", "15-20 minutes ago")
 
-class SecureCYTMonitor:
-    past_five_mins_macs: Set[str] = set()
-    five_ten_min_ago_macs: Set[str] = set()
-    ten_fifteen_min_ago_macs: Set[str] = set()
-    fifteen_twenty_min_ago_macs: Set[str] = set()
 
-    past_five_mins_ssids: Set[str] = set()
-    five_ten_min_ago_ssids: Set[str] = set()
-    ten_fifteen_min_ago_ssids: Set[str] = set()
-    fifteen_twenty_min_ago_ssids: Set[str] = set()
+def new_windows() -> Deque[Set[str]]:
+    """Create an empty ring buffer of time-windowed sets, most recent first"""
+    return deque([set() for _ in WINDOW_LABELS], maxlen=len(WINDOW_LABELS))
+
 
-    def __init__(self, config: Dict[str, Any], ignore_list: List[str], ssid_ignore_list: List[str], log_file: IO, probes_file: IO):
+class SecureCYTMonitor:
+    def __init__(self, config: Dict[str, Any], db_path: str, ignore_list: Iterable[str], ssid_ignore_list: Iterable[str], log_file: IO, probes_file: BufferedEventWriter):
         self.config = config
-        self.ignore_list = set(mac.upper() for mac in ignore_list)
-        self.ssid_ignore_list = set(ssid_ignore_list)
+        # MACs are expected to be uppercase already (see load_ignore_lists); frozenset is a no-op for frozensets
+        self.ignore_list = frozenset(ignore_list)
+        self.ssid_ignore_list = frozenset(ssid_ignore_list)
         self.log_file = log_file
         self.probes_file = probes_file
         self.time_manager = SecureTimeWindows(config)
-
-    def initialize_tracking_lists(self, db: KismetDB) -> None:
+        self._info_enabled = logger.isEnabledFor(logging.INFO)
+        self.mac_windows = new_windows()
+        self.ssid_windows = new_windows()
+        # Single long-lived connection, kept open for the lifetime of the monitor
+        self.db = KismetDB(db_path, self.ignore_list, self.ssid_ignore_list)
+
+    def switch_database(self, db_path: str) -> None:
+        """Reconnect to another Kismet database, keeping the tracking lists"""
+        self.db.close()
+        self.db = KismetDB(db_path, self.ignore_list, self.ssid_ignore_list)
+        self.db.connect()
+
+    def initialize_tracking_lists(self) -> None:
         """Initialize all tracking lists securely"""
         try:
             boundaries = self.time_manager.get_time_boundaries()
 
             # Initialize MAC tracking lists
-            self.__initialize_mac_lists(db, boundaries)
+            self.__initialize_mac_lists(self.db, boundaries)
 
             # Initialize SSID tracking lists  
-            self.__initialize_ssid_lists(db, boundaries)
+            self.__initialize_ssid_lists(self.db, boundaries)
 
             self.__log_initialization_stats()
 
@@ -53,75 +63,68 @@ class SecureCYTMonitor:
         """Initialize MAC address tracking lists"""
         # Past 5 minutes
         macs = db.get_mac_addresses_by_time_range(boundaries['recent_time'])
-        self.past_five_mins_macs = self.__filter_macs(macs)
+        self.mac_windows[0] = self.__filter_macs(macs)
 
         # 5-10 minutes ago
         macs = db.get_mac_addresses_by_time_range(boundaries['medium_time'], boundaries['recent_time'])
-        self.five_ten_min_ago_macs = self.__filter_macs(macs)
+        self.mac_windows[1] = self.__filter_macs(macs)
 
         # 10-15 minutes ago
         macs = db.get_mac_addresses_by_time_range(boundaries['old_time'], boundaries['medium_time'])
-        self.ten_fifteen_min_ago_macs = self.__filter_macs(macs)
+        self.mac_windows[2] = self.__filter_macs(macs)
 
         # 15-20 minutes ago
         macs = db.get_mac_addresses_by_time_range(boundaries['oldest_time'], boundaries['old_time'])
-        self.fifteen_twenty_min_ago_macs = self.__filter_macs(macs)
+        self.mac_windows[3] = self.__filter_macs(macs)
 
     def __initialize_ssid_lists(self, db: KismetDB, boundaries: Dict[str, float]) -> None:
         """Initialize SSID tracking lists"""
         # Past 5 minutes
         probes = db.get_probe_requests_by_time_range(boundaries['recent_time'])
-        self.past_five_mins_ssids = self.__filter_ssids([p['ssid'] for p in probes])
+        self.ssid_windows[0] = self.__filter_ssids(probes)
 
         # 5-10 minutes ago
         probes = db.get_probe_requests_by_time_range(boundaries['medium_time'], boundaries['recent_time'])
-        self.five_ten_min_ago_ssids = self.__filter_ssids([p['ssid'] for p in probes])
+        self.ssid_windows[1] = self.__filter_ssids(probes)
 
         # 10-15 minutes ago
         probes = db.get_probe_requests_by_time_range(boundaries['old_time'], boundaries['medium_time'])
-        self.ten_fifteen_min_ago_ssids = self.__filter_ssids([p['ssid'] for p in probes])
+        self.ssid_windows[2] = self.__filter_ssids(probes)
 
         # 15-20 minutes ago
         probes = db.get_probe_requests_by_time_range(boundaries['oldest_time'], boundaries['old_time'])
-        self.fifteen_twenty_min_ago_ssids = self.__filter_ssids([p['ssid'] for p in probes])
+        self.ssid_windows[3] = self.__filter_ssids(probes)
 
-    def __filter_macs(self, mac_list: List[str]) -> Set[str]:
-        """Filter MAC addresses against ignore list"""
-        return {mac.upper() for mac in mac_list if mac.upper() not in self.ignore_list}
+    def __filter_macs(self, mac_list: Iterable[str]) -> Set[str]:
+        """Collect MAC addresses (uppercased and ignore-filtered by the database query)"""
+        return set(mac_list)
 
-    def __filter_ssids(self, ssid_list: List[str]) -> Set[str]:
-        """Filter SSIDs against ignore list"""
-        return {ssid for ssid in ssid_list if ssid and ssid not in self.ssid_ignore_list}
+    def __filter_ssids(self, probes: Iterable[Dict[str, str]]) -> Set[str]:
+        """Collect probed SSIDs (ignore list is already applied by the database query)"""
+        return {probe['ssid'] for probe in probes if probe['ssid']}
 
     def __log_initialization_stats(self) -> None:
         """Log initialization statistics"""
-        mac_stats = [
-            ("Past 5 minutes", len(self.past_five_mins_macs)),
-            ("5-10 minutes ago", len(self.five_ten_min_ago_macs)),
-            ("10-15 minutes ago", len(self.ten_fifteen_min_ago_macs)),
-            ("15-20 minutes ago", len(self.fifteen_twenty_min_ago_macs))
-        ]
-
-        ssid_stats = [
-            ("Past 5 minutes", len(self.past_five_mins_ssids)),
-            ("5-10 minutes ago", len(self.five_ten_min_ago_ssids)),
-            ("10-15 minutes ago", len(self.ten_fifteen_min_ago_ssids)),
-            ("15-20 minutes ago", len(self.fifteen_twenty_min_ago_ssids))
-        ]
-
-        for period, count in mac_stats:
-            logger.info("%s MACs added to the %s list", count, period)
-
-        for period, count in ssid_stats:
-            logger.info("%s Probed SSIDs added to the %s list", count, period)
-
-    def process_current_activity(self, db: KismetDB) -> None:
+        for period, macs in zip(WINDOW_LABELS, self.mac_windows):
+            logger.info("%s MACs added to the %s list", len(macs), period)
+
+        for period, ssids in zip(WINDOW_LABELS, self.ssid_windows):
+            logger.info("%s Probed SSIDs added to the %s list", len(ssids), period)
+
+    def process_current_activity(self, boundaries: Dict[str, float]) -> None:
         """Process current activity and detect matches"""
         try:
-            boundaries = self.time_manager.get_time_boundaries()
+            # One timestamp for every probe event seen in this cycle
+            now = datetime.now()
+            # Checked once per cycle so per-probe logging is skipped cheaply when INFO is disabled
+            self._info_enabled = logger.isEnabledFor(logging.INFO)
 
             # Get current devices and probes
-            current_devices = db.get_devices_by_time_range(boundaries['current_time'])
+            current_devices = self.db.get_devices_by_time_range(boundaries['current_time'])
+
+            # Kismet keeps one row per PHY, so the same MAC (and probe) can show up several times per cycle
+            seen_macs: Set[str] = set()
+            seen_probes: Set[Tuple[str, str]] = set()
 
             for device in current_devices:
                 mac = device['mac']
@@ -131,16 +134,21 @@ class SecureCYTMonitor:
                     continue
 
                 # Check for probe requests
-                self.__process_probe_requests(device_data, mac)
+                self.__process_probe_requests(device_data, mac, now, seen_probes)
 
                 # Check MAC address tracking
-                self.__process_mac_tracking(mac)
+                if mac not in seen_macs:
+                    seen_macs.add(mac)
+                    self.__process_mac_tracking(mac)
 
         except Exception as e:
             logger.error(f"Error processing current activity", exc_info=e)
+        finally:
+            # Don't leave this cycle's probe events buffered while sleeping until the next one
+            self.probes_file.flush()
 
-    def __process_probe_requests(self, device_data: Dict, mac: str) -> None:
-        """Process probe requests from device data"""
+    def __process_probe_requests(self, device_data: Dict, mac: str, now: datetime, seen_probes: Set[Tuple[str, str]]) -> None:
+        """Process probe requests from device data, skipping (mac, ssid) pairs already seen this cycle"""
         if not device_data:
             return
 
@@ -157,65 +165,48 @@ class SecureCYTMonitor:
             if not ssid or ssid in self.ssid_ignore_list:
                 return
 
-            write_event_log(event_log_file, SSIDProbeEvent(datetime.now(), ssid, mac))
+            if (mac, ssid) in seen_probes:
+                return
+            seen_probes.add((mac, ssid))
 
-            logger.info("Probe detected from %s: %s", mac, ssid)
+            self.probes_file.write(SSIDProbeEvent(now, ssid, mac))
+
+            if self._info_enabled:
+                logger.info("Probe detected from %s: %s", mac, ssid)
 
             # Check against historical lists
             self.__check_ssid_history(ssid)
 
-        except (KeyError, TypeError, AttributeError) as e:
-            logger.debug("No probe data for device %s", mac, exc_info=e)
+        except (KeyError, TypeError, AttributeError):
+            # Devices without probe data are expected, nothing to do
+            return
 
     def __check_ssid_history(self, ssid: str) -> None:
         """Check SSID against historical tracking lists"""
-        if ssid in self.five_ten_min_ago_ssids:
-            logger.warning("Repeated probe detected: %s (5-10 min window)", ssid)
-
-        if ssid in self.ten_fifteen_min_ago_ssids:
-            logger.warning("Repeated probe detected: %s (10-15 min window)", ssid)
-
-        if ssid in self.fifteen_twenty_min_ago_ssids:
-            logger.warning("Repeated probe detected: %s (15-20 min window)", ssid)
+        for idx, bucket in enumerate(self.ssid_windows):
+            if idx and ssid in bucket:
+                logger.warning("Repeated probe detected: %s (%s)", ssid, WINDOW_LABELS[idx])
 
     def __process_mac_tracking(self, mac: str) -> None:
-        """Process MAC address tracking"""
-        if mac.upper() in self.ignore_list:
-            return
-
+        """Process MAC address tracking (ignored MACs are already filtered out by the database query)"""
         # Check against historical lists
-        if mac in self.five_ten_min_ago_macs:
-            logger.warning("Device reappeared: %s (5-10 min window)", mac)
-
-        if mac in self.ten_fifteen_min_ago_macs:
-            logger.warning("Device reappeared: %s (10-15 min window)", mac)
+        for idx, bucket in enumerate(self.mac_windows):
+            if idx and mac in bucket:
+                logger.warning("Device reappeared: %s (%s)", mac, WINDOW_LABELS[idx])
 
-        if mac in self.fifteen_twenty_min_ago_macs:
-            logger.warning("Device reappeared: %s (15-20 min window)", mac)
-
-    def rotate_tracking_lists(self, db: KismetDB) -> None:
+    def rotate_tracking_lists(self, boundaries: Dict[str, float]) -> None:
         """Rotate tracking lists and update with fresh data"""
         try:
-            # Rotate MAC lists
-            self.fifteen_twenty_min_ago_macs = self.ten_fifteen_min_ago_macs
-            self.ten_fifteen_min_ago_macs = self.five_ten_min_ago_macs
-            self.five_ten_min_ago_macs = self.past_five_mins_macs
-
-            # Rotate SSID lists
-            self.fifteen_twenty_min_ago_ssids = self.ten_fifteen_min_ago_ssids
-            self.ten_fifteen_min_ago_ssids = self.five_ten_min_ago_ssids
-            self.five_ten_min_ago_ssids = self.past_five_mins_ssids
+            # Retry the last_time index if it couldn't be created yet (e.g. Kismet was busy or had no devices table)
+            self.db.ensure_time_index()
 
-            # Get fresh data for past 5 minutes
-            boundaries = self.time_manager.get_time_boundaries()
+            # Rotate MAC lists: the fresh set becomes the most recent window, the oldest one is dropped
+            macs = self.db.get_mac_addresses_by_time_range(boundaries['recent_time'])
+            self.mac_windows.appendleft(self.__filter_macs(macs))
 
-            # Update past 5 minutes MAC list
-            macs = db.get_mac_addresses_by_time_range(boundaries['recent_time'])
-            self.past_five_mins_macs = self.__filter_macs(macs)
-
-            # Update past 5 minutes SSID list
-            probes = db.get_probe_requests_by_time_range(boundaries['recent_time'])
-            self.past_five_mins_ssids = self.__filter_ssids([p['ssid'] for p in probes])
+            # Rotate SSID lists the same way
+            probes = self.db.get_probe_requests_by_time_range(boundaries['recent_time'])
+            self.ssid_windows.appendleft(self.__filter_ssids(probes))
 
             self.__log_rotation_stats()
 
@@ -224,11 +215,9 @@ class SecureCYTMonitor:
 
     def __log_rotation_stats(self) -> None:
         """Log rotation statistics"""
-        # Log to file
-        logger.info("%s MACs moved to the 15-20 Min list", len(self.fifteen_twenty_min_ago_macs))
-        logger.info("%s MACs moved to the 10-15 Min list", len(self.ten_fifteen_min_ago_macs))
-        logger.info("%s MACs moved to the 5 to 10 mins ago list", len(self.five_ten_min_ago_macs))
-
-        logger.info("Probed SSIDs moved to the 15 to 20 mins ago list", len(self.fifteen_twenty_min_ago_ssids))
-        logger.info("%s Probed SSIDs moved to the 10 to 15 mins ago list", len(self.ten_fifteen_min_ago_ssids))
-        logger.info("%s Probed SSIDs moved to the 5 to 10 mins ago list", len(self.five_ten_min_ago_ssids))
+        # Log to file, oldest window first
+        for idx in reversed(range(1, len(WINDOW_LABELS))):
+            logger.info("%s MACs moved to the %s list", len(self.mac_windows[idx]), WINDOW_LABELS[idx])
+
+        for idx in reversed(range(1, len(WINDOW_LABELS))):
+            logger.info("%s Probed SSIDs moved to the %s list", len(self.ssid_windows[idx]), WINDOW_LABELS[idx])
@@ -1,7 +1,36 @@
+import fnmatch
+import glob
 import json
-from typing import Dict, Any
+import os
+from typing import Dict, Any, Optional
 
 
 def load_config(config_path: str = 'config.json') -> Dict[str, Any]:
     with open(config_path, 'r') as f:
         return json.load(f)
+
+
+def find_latest_file(pattern: str) -> Optional[str]:
+    """Find the most recently created file matching a glob pattern, or None if nothing matches"""
+    directory, name_pattern = os.path.split(pattern)
+
+    if glob.has_magic(directory):
+        # Wildcards in the directory part need a real glob
+        list_of_files = glob.glob(pattern)
+        return max(list_of_files, key=os.path.getctime) if list_of_files else None
+
+    # Single pass over the directory, stat-ing only the entries that match
+    latest_file, latest_ctime = None, None
+    try:
+        with os.scandir(directory or '.') as entries:
+            for entry in entries:
+                if not fnmatch.fnmatch(entry.name, name_pattern) or not entry.is_file():
+                    continue
+
+                ctime = entry.stat().st_ctime
+                if latest_ctime is None or ctime > latest_ctime:
+                    latest_file, latest_ctime = entry.path, ctime
+    except FileNotFoundError:
+        return None
+
+    return latest_file